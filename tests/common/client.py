@@ -6,24 +6,51 @@ Provides common functionality for all kiosk components to interact with NATS.
 
 import asyncio
 import json
+import logging
+import os
+from collections import deque
 from typing import Callable, Optional, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 
 import nats
 from nats.aio.client import Client as NATSClient
 from nats.aio.msg import Msg
+from nats.errors import ConnectionClosedError, NoRespondersError
 from nats.js import JetStreamContext
 
-from .message import NATSMessage, create_response
+try:
+    import uvloop
+except ImportError:  # Optional: fall back to the default asyncio loop
+    uvloop = None
 
+from .message import (
+    NATSMessage,
+    WireCodec,
+    create_response,
+    decode_message,
+    decode_payload,
+    get_codec,
+)
 
-@dataclass
+
+# Per-message tracing, off unless KIOSK_NATS_VERBOSE=1/true/yes (checked once at import)
+_VERBOSE = os.environ.get("KIOSK_NATS_VERBOSE", "").strip().lower() in ("1", "true", "yes")
+
+# Output goes through the application's logging config (e.g. basicConfig)
+log = logging.getLogger("kiosk.nats")
+if _VERBOSE:
+    log.setLevel(logging.DEBUG)
+
+
+@dataclass(slots=True)
 class NATSConfig:
     """NATS connection configuration."""
     url: str = "nats://localhost:4222"
     name: str = "kiosk-client"
     reconnect_time_wait: int = 2
     max_reconnect_attempts: int = -1  # Infinite
+    no_echo: bool = False  # Don't deliver this connection's own publishes back to it
+    codec: str = "json"  # Outgoing wire codec: "json" or "msgpack" (incoming is detected)
 
 
 class KioskNATSClient:
@@ -31,7 +58,7 @@ class KioskNATSClient:
     Base NATS client for kiosk components.
     
     Provides:
-    - Connection management
+    - Connection management (refcounted, shareable via shared())
     - Pub/Sub pattern
     - Request/Reply pattern
     - JetStream integration
@@ -41,16 +68,84 @@ class KioskNATSClient:
         self.config = config or NATSConfig(name=name)
         self.nc: Optional[NATSClient] = None
         self.js: Optional[JetStreamContext] = None
+        self.codec = get_codec(self.config.codec)
         self._subscriptions = []
-        self._running = False
+        self._stop_event = asyncio.Event()
+        self._handler_tasks: set[asyncio.Task] = set()
+        
+        # Request/reply mux: one inbox subscription shared by all requests.
+        # In-flight requests live in a power-of-two ring of (seq, future)
+        # slots indexed by seq & mask; the seq is the reply subject token.
+        # nc.request() has a similar built-in mux, but this one lets _close()
+        # fail in-flight requests with ConnectionClosedError at once (nats.py
+        # leaves its futures to time out), lets request_many() write a burst
+        # before awaiting any reply, and keys replies by a plain int instead
+        # of a fresh NUID token plus done callback per request.
+        self._inbox_prefix = ""
+        self._reply_slots: list[Optional[tuple[int, asyncio.Future]]] = [None] * 1024
+        self._reply_mask = 1023
+        self._next_seq = 0
+        
+        # Users sharing this connection; see get_shared_client()
+        self._refs = 0
+        self._connect_lock = asyncio.Lock()
+    
+    @classmethod
+    def shared(cls, config: NATSConfig = None) -> "KioskNATSClient | CodecHandle":
+        """
+        Get the process-wide client for a server URL.
+        
+        Components co-hosted in one process share a single connection
+        (and flush loop) this way; the first caller's config labels it.
+        A caller whose outgoing codec differs from the shared client's gets
+        a CodecHandle over the same connection. connect()/disconnect() are
+        refcounted, so each component still pairs its own calls.
+        
+        Raises:
+            ValueError: If config's connection settings (reconnect,
+                no_echo) differ from the existing client's
+        """
+        config = config or NATSConfig()
+        client = _shared_clients.get(config.url)
+        if client is None:
+            client = _shared_clients[config.url] = cls(config=config)
+        elif replace(config, name=client.config.name, codec=client.config.codec) != client.config:
+            raise ValueError(
+                f"Shared NATS client for {config.url} already exists "
+                f"with different connection settings: {client.config}"
+            )
+        
+        if config.codec != client.config.codec:
+            return CodecHandle(client, config.codec)
+        return client
+    
+    @property
+    def is_connected(self) -> bool:
+        """Whether the underlying NATS connection is open."""
+        return self.nc is not None and self.nc.is_connected
     
     async def connect(self) -> None:
-        """Connect to NATS server."""
+        """
+        Connect to NATS server.
+        
+        Calls are counted: connecting an already connected client only
+        takes another reference, released by a matching disconnect().
+        """
+        async with self._connect_lock:
+            if self._refs and self.nc is not None:
+                self._refs += 1
+                return
+            await self._open()
+            self._refs = 1
+    
+    async def _open(self) -> None:
+        """Open the NATS connection and the shared reply inbox."""
         self.nc = await nats.connect(
             servers=[self.config.url],
             name=self.config.name,
             reconnect_time_wait=self.config.reconnect_time_wait,
             max_reconnect_attempts=self.config.max_reconnect_attempts,
+            no_echo=self.config.no_echo,
             error_cb=self._on_error,
             disconnected_cb=self._on_disconnect,
             reconnected_cb=self._on_reconnect,
@@ -59,35 +154,97 @@ class KioskNATSClient:
         # Initialize JetStream
         self.js = self.nc.jetstream()
         
+        # Single wildcard inbox for all replies to request()
+        self._inbox_prefix = self.nc.new_inbox()
+        await self.nc.subscribe(f"{self._inbox_prefix}.*", cb=self._on_reply)
+        
         print(f"✅ Connected to NATS: {self.config.url} as '{self.config.name}'")
     
     async def disconnect(self) -> None:
-        """Disconnect from NATS server."""
+        """Release one connect() reference; close when none remain."""
+        async with self._connect_lock:
+            if self._refs > 1:
+                self._refs -= 1
+                return
+            self._refs = 0
+            await self._close()
+    
+    async def _close(self) -> None:
+        """Drain and close the NATS connection."""
         if self.nc:
+            # Stop taking requests, then let in-flight handlers reply
+            # before drain() closes the connection under them
+            for sub in self._subscriptions:
+                await sub.drain()
+            self._subscriptions.clear()
+            if self._handler_tasks:
+                await asyncio.gather(*self._handler_tasks, return_exceptions=True)
             await self.nc.drain()
             await self.nc.close()
+            self.nc = None
+            self._fail_pending_requests(ConnectionClosedError())
             print(f"👋 Disconnected from NATS")
     
     # ========================================
     # Pub/Sub Pattern
     # ========================================
     
-    async def publish(self, subject: str, message: NATSMessage) -> None:
+    async def publish(
+        self,
+        subject: str,
+        message: NATSMessage,
+        codec: Optional[WireCodec] = None
+    ) -> None:
         """
         Publish an event to a subject.
         
         Args:
             subject: NATS subject (e.g., "kiosk.vision.person_detected")
             message: NATSMessage to publish
+            codec: Outgoing wire codec (default: the client's)
+        """
+        await self.nc.publish(subject, (codec or self.codec).encode(message))
+        if _VERBOSE:
+            log.debug("Published to %s: %s", subject, message.payload.get("event") or message.payload.get("command"))
+    
+    async def publish_raw(self, subject: str, data: bytes) -> None:
+        """
+        Publish pre-encoded envelope bytes as-is.
+        
+        `data` must already be in the wire format subscribers expect
+        (e.g. built with EnvelopeTemplate).
+        """
+        await self.nc.publish(subject, data)
+        if _VERBOSE:
+            log.debug("Published raw to %s", subject)
+    
+    async def publish_batch(
+        self,
+        items: list[tuple[str, NATSMessage]],
+        codec: Optional[WireCodec] = None
+    ) -> None:
         """
-        await self.nc.publish(subject, message.to_bytes())
-        print(f"📤 Published to {subject}: {message.payload.get('event', message.payload.get('command', 'message'))}")
+        Publish several events and flush the connection once.
+        
+        Args:
+            items: (subject, message) pairs to publish in order
+            codec: Outgoing wire codec (default: the client's)
+        """
+        codec = codec or self.codec
+        for subject, message in items:
+            await self.nc.publish(subject, codec.encode(message))
+        await self.nc.flush()
+        if _VERBOSE:
+            log.debug("Published batch of %d messages", len(items))
     
     async def subscribe(
         self,
         subject: str,
         handler: Callable[[NATSMessage], Any],
-        queue: str = None
+        queue: str = None,
+        pending_msgs_limit: Optional[int] = None,
+        pending_bytes_limit: Optional[int] = None,
+        payload_only: bool = False
     ) -> None:
         """
         Subscribe to a subject pattern.
@@ -96,18 +253,40 @@ class KioskNATSClient:
             subject: NATS subject pattern (e.g., "kiosk.vision.>")
             handler: Async function to handle received messages
             queue: Optional queue group for load balancing
+            pending_msgs_limit: Max buffered messages before drops (nats.py default if None)
+            pending_bytes_limit: Max buffered bytes before drops (nats.py default if None)
+            payload_only: Pass the payload dict instead of a NATSMessage to
+                the handler, for consumers that never read the envelope
         """
+        decode = decode_payload if payload_only else decode_message
+        
         async def _wrapper(msg: Msg):
             try:
-                nats_msg = NATSMessage.from_bytes(msg.data)
-                await handler(nats_msg, msg.subject)
+                await handler(decode(msg.data), msg.subject)
             except Exception as e:
                 print(f"❌ Error handling message on {msg.subject}: {e}")
         
-        sub = await self.nc.subscribe(subject, queue=queue, cb=_wrapper)
-        self._subscriptions.append(sub)
+        await self._subscribe(subject, queue, _wrapper, pending_msgs_limit, pending_bytes_limit)
         print(f"📥 Subscribed to {subject}" + (f" (queue: {queue})" if queue else ""))
     
+    async def _subscribe(
+        self,
+        subject: str,
+        queue: Optional[str],
+        cb: Callable[[Msg], Any],
+        pending_msgs_limit: Optional[int],
+        pending_bytes_limit: Optional[int]
+    ) -> None:
+        """Create a subscription, forwarding only the buffer limits that were set."""
+        limits = {}
+        if pending_msgs_limit is not None:
+            limits["pending_msgs_limit"] = pending_msgs_limit
+        if pending_bytes_limit is not None:
+            limits["pending_bytes_limit"] = pending_bytes_limit
+        
+        sub = await self.nc.subscribe(subject, queue=queue, cb=cb, **limits)
+        self._subscriptions.append(sub)
+    
     # ========================================
     # Request/Reply Pattern
     # ========================================
@@ -116,37 +295,155 @@ class KioskNATSClient:
         self,
         subject: str,
         message: NATSMessage,
-        timeout: float = 5.0
+        timeout: float = 5.0,
+        codec: Optional[WireCodec] = None
     ) -> NATSMessage:
         """
         Send a request and wait for reply.
         
+        Replies arrive on the client's shared inbox subscription, so no
+        subscription is created per request.
+        
         Args:
             subject: NATS subject (e.g., "kiosk.agent.menu.search")
             message: Request message
             timeout: Timeout in seconds
+            codec: Outgoing wire codec (default: the client's)
             
         Returns:
             Response message from the agent
         """
-        print(f"🔄 Request to {subject}: {message.payload.get('command', 'request')}")
+        if _VERBOSE:
+            log.debug("Request to %s: %s", subject, message.payload.get("command"))
         
-        response = await self.nc.request(
-            subject,
-            message.to_bytes(),
-            timeout=timeout
-        )
+        seq, future = await self._send_request(subject, message, codec or self.codec)
+        try:
+            response = await asyncio.wait_for(future, timeout)
+        finally:
+            self._release_reply_slot(seq)
         
-        response_msg = NATSMessage.from_bytes(response.data)
-        print(f"✅ Reply from {subject}: {response_msg.payload.get('status', 'received')}")
+        response_msg = decode_message(response.data)
+        if _VERBOSE:
+            log.debug("Reply from %s: %s", subject, response_msg.payload.get("status"))
         
         return response_msg
     
+    async def request_many(
+        self,
+        items: list[tuple[str, NATSMessage]],
+        timeout: float = 5.0,
+        return_exceptions: bool = False,
+        codec: Optional[WireCodec] = None
+    ) -> list:
+        """
+        Send several requests at once and wait for all replies.
+        
+        Every request is written before any reply is awaited and the
+        connection is flushed once for the whole burst.
+        
+        Args:
+            items: (subject, message) pairs to send
+            timeout: Per-request timeout in seconds
+            return_exceptions: Return failures in the result list instead
+                of raising the first one (as asyncio.gather does)
+            codec: Outgoing wire codec (default: the client's)
+            
+        Returns:
+            Response messages in the same order as `items`
+        """
+        codec = codec or self.codec
+        seqs = []
+        futures = []
+        try:
+            for subject, message in items:
+                seq, future = await self._send_request(subject, message, codec)
+                seqs.append(seq)
+                futures.append(future)
+            await self.nc.flush()
+            
+            responses = await asyncio.gather(
+                *(asyncio.wait_for(future, timeout) for future in futures),
+                return_exceptions=return_exceptions
+            )
+        finally:
+            for seq in seqs:
+                self._release_reply_slot(seq)
+        
+        results = []
+        for response in responses:
+            if isinstance(response, BaseException):
+                results.append(response)
+                continue
+            try:
+                results.append(decode_message(response.data))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+    
+    async def _send_request(
+        self,
+        subject: str,
+        message: NATSMessage,
+        codec: WireCodec
+    ) -> tuple[int, asyncio.Future]:
+        """Publish a request with a reply token on the shared inbox."""
+        seq, future = self._acquire_reply_slot()
+        try:
+            await self.nc.publish(
+                subject,
+                codec.encode(message),
+                reply=f"{self._inbox_prefix}.{seq}"
+            )
+        except BaseException:
+            self._release_reply_slot(seq)
+            raise
+        return seq, future
+    
+    def _acquire_reply_slot(self) -> tuple[int, asyncio.Future]:
+        """Claim a free reply slot, doubling the ring if all are in flight."""
+        slots = self._reply_slots
+        for _ in range(len(slots)):
+            seq = self._next_seq
+            self._next_seq += 1
+            index = seq & self._reply_mask
+            if slots[index] is None:
+                future = asyncio.get_running_loop().create_future()
+                slots[index] = (seq, future)
+                return seq, future
+        
+        # Live seqs are distinct modulo the old size, so they stay
+        # distinct modulo the doubled size
+        grown = [None] * (len(slots) * 2)
+        mask = len(grown) - 1
+        for entry in slots:
+            grown[entry[0] & mask] = entry
+        self._reply_slots = grown
+        self._reply_mask = mask
+        return self._acquire_reply_slot()
+    
+    def _fail_pending_requests(self, error: Exception) -> None:
+        """Fail every in-flight request instead of letting it run into its timeout."""
+        for entry in self._reply_slots:
+            if entry is not None and not entry[1].done():
+                entry[1].set_exception(error)
+    
+    def _release_reply_slot(self, seq: int) -> None:
+        """Free the slot held by `seq`, if it still holds it."""
+        index = seq & self._reply_mask
+        entry = self._reply_slots[index]
+        if entry is not None and entry[0] == seq:
+            self._reply_slots[index] = None
+    
     async def reply_handler(
         self,
         subject: str,
         handler: Callable[[NATSMessage], NATSMessage],
-        queue: str = None
+        queue: str = None,
+        pending_msgs_limit: Optional[int] = None,
+        pending_bytes_limit: Optional[int] = None,
+        max_inflight: Optional[int] = None
     ) -> None:
         """
         Set up a reply handler for request/reply pattern.
@@ -155,32 +452,147 @@ class KioskNATSClient:
             subject: NATS subject to listen on
             handler: Function that takes request and returns response
             queue: Optional queue group for load balancing
+            pending_msgs_limit: Max buffered requests before drops (nats.py default if None)
+            pending_bytes_limit: Max buffered bytes before drops (nats.py default if None)
+            max_inflight: Handle up to this many requests concurrently
+                (default: one at a time, in arrival order)
         """
         async def _wrapper(msg: Msg):
+            await self._handle_request(msg, handler)
+        
+        cb = self._concurrent(_wrapper, max_inflight) if max_inflight else _wrapper
+        await self._subscribe(subject, queue, cb, pending_msgs_limit, pending_bytes_limit)
+        print(f"🎯 Reply handler registered for {subject}" + (f" (queue: {queue})" if queue else ""))
+    
+    async def reply_handler_multi(
+        self,
+        prefix: str,
+        handler_map: dict[str, Callable[[NATSMessage], NATSMessage]],
+        queue: str = None,
+        pending_msgs_limit: Optional[int] = None,
+        pending_bytes_limit: Optional[int] = None,
+        max_inflight: Optional[int] = None
+    ) -> None:
+        """
+        Serve several request subjects from one wildcard subscription.
+        
+        Requests on "<prefix>.<name>" are dispatched to handler_map[name];
+        unknown names get an UNKNOWN_COMMAND error reply.
+        
+        Args:
+            prefix: Subject prefix (e.g., "kiosk.agent.menu")
+            handler_map: Last subject token -> handler
+            queue, pending_msgs_limit, pending_bytes_limit, max_inflight:
+                As for reply_handler()
+        """
+        async def _wrapper(msg: Msg):
+            await self._handle_request(msg, handler_map.get(msg.subject.rsplit(".", 1)[-1]))
+        
+        subject = f"{prefix}.*"
+        cb = self._concurrent(_wrapper, max_inflight) if max_inflight else _wrapper
+        await self._subscribe(subject, queue, cb, pending_msgs_limit, pending_bytes_limit)
+        print(f"🎯 Reply handler registered for {subject} -> {', '.join(handler_map)}" + (f" (queue: {queue})" if queue else ""))
+    
+    async def _handle_request(
+        self,
+        msg: Msg,
+        handler: Optional[Callable[[NATSMessage], NATSMessage]]
+    ) -> None:
+        """Decode a request, run its handler and send the reply (or an error reply)."""
+        try:
+            request_msg = decode_message(msg.data)
+        except Exception as e:
+            # Unparseable request: reply without the original trace
+            error_response = create_response(
+                status="error",
+                payload={"error_code": "PARSE_ERROR", "error_message": str(e)},
+                original_msg=NATSMessage()
+            )
+            await msg.respond(self.codec.encode(error_response))
+            print(f"❌ Error parsing request on {msg.subject}: {e}")
+            return
+        
+        if _VERBOSE:
+            log.debug("Request received on %s: %s", msg.subject, request_msg.payload.get("command"))
+        
+        # Reply in the format the requester used
+        reply_codec = get_codec(request_msg.content_type)
+        
+        if handler is None:
+            error_response = create_response(
+                status="error",
+                payload={"error_code": "UNKNOWN_COMMAND", "error_message": f"No handler for {msg.subject}"},
+                original_msg=request_msg
+            )
+            await msg.respond(reply_codec.encode(error_response))
+            return
+        
+        try:
+            # Call handler to get response
+            response_msg = await handler(request_msg)
+            
+            # Send reply
+            await msg.respond(reply_codec.encode(response_msg))
+            if _VERBOSE:
+                log.debug("Reply sent: %s", response_msg.payload.get("status"))
+            
+        except Exception as e:
+            # Send error response
+            error_response = create_response(
+                status="error",
+                payload={"error_code": "HANDLER_ERROR", "error_message": str(e)},
+                original_msg=request_msg
+            )
+            await msg.respond(reply_codec.encode(error_response))
+            print(f"❌ Error handling request: {e}")
+    
+    def _concurrent(
+        self,
+        cb: Callable[[Msg], Any],
+        max_inflight: int
+    ) -> Callable[[Msg], Any]:
+        """
+        Wrap a subscription callback so up to `max_inflight` calls run as
+        concurrent tasks. When all slots are busy the subscription stops
+        dispatching until one frees up.
+        """
+        slots = asyncio.Semaphore(max_inflight)
+        
+        async def _run(msg: Msg):
             try:
-                request_msg = NATSMessage.from_bytes(msg.data)
-                print(f"📨 Request received on {msg.subject}: {request_msg.payload.get('command', 'request')}")
-                
-                # Call handler to get response
-                response_msg = await handler(request_msg)
-                
-                # Send reply
-                await msg.respond(response_msg.to_bytes())
-                print(f"📬 Reply sent: {response_msg.payload.get('status', 'response')}")
-                
+                await cb(msg)
             except Exception as e:
-                # Send error response
-                error_response = create_response(
-                    status="error",
-                    payload={"error_code": "HANDLER_ERROR", "error_message": str(e)},
-                    original_msg=NATSMessage.from_bytes(msg.data)
-                )
-                await msg.respond(error_response.to_bytes())
-                print(f"❌ Error handling request: {e}")
-        
-        sub = await self.nc.subscribe(subject, queue=queue, cb=_wrapper)
-        self._subscriptions.append(sub)
-        print(f"🎯 Reply handler registered for {subject}" + (f" (queue: {queue})" if queue else ""))
+                # e.g. respond() failing in the error path; the task is
+                # dropped unawaited, so report it here
+                print(f"❌ Error handling request on {msg.subject}: {e}")
+            finally:
+                slots.release()
+        
+        async def _dispatch(msg: Msg):
+            await slots.acquire()
+            task = asyncio.create_task(_run(msg))
+            self._handler_tasks.add(task)
+            task.add_done_callback(self._handler_tasks.discard)
+        
+        return _dispatch
+    
+    async def _on_reply(self, msg: Msg) -> None:
+        """Resolve the pending request matching a reply's inbox token."""
+        try:
+            seq = int(msg.subject[len(self._inbox_prefix) + 1:])
+        except ValueError:
+            return
+        
+        entry = self._reply_slots[seq & self._reply_mask]
+        if entry is None or entry[0] != seq or entry[1].done():
+            return  # Late reply for a request that already timed out
+        
+        future = entry[1]
+        
+        if msg.headers and msg.headers.get("Status") == "503":
+            future.set_exception(NoRespondersError())
+        else:
+            future.set_result(msg)
     
     # ========================================
     # JetStream (Persistent Messages)
@@ -216,12 +628,11 @@ class KioskNATSClient:
     
     async def run_forever(self):
         """Keep the client running until interrupted."""
-        self._running = True
+        self._stop_event.clear()
         print("🚀 Client running. Press Ctrl+C to stop.")
         
         try:
-            while self._running:
-                await asyncio.sleep(1)
+            await self._stop_event.wait()
         except asyncio.CancelledError:
             pass
         finally:
@@ -229,4 +640,147 @@ class KioskNATSClient:
     
     def stop(self):
         """Signal the client to stop."""
-        self._running = False
+        self._stop_event.set()
+
+
+# ============================================================
+# Event Loop
+# ============================================================
+
+def run(main) -> Any:
+    """Run a coroutine to completion, on uvloop when it is installed."""
+    if uvloop is not None:
+        return uvloop.run(main)
+    return asyncio.run(main)
+
+
+# ============================================================
+# Request Batching
+# ============================================================
+
+class BatchedRequester:
+    """
+    Coalesces individual requests into request_many() bursts.
+    
+    The first queued request schedules a flush on the next event loop
+    tick, so a lone request goes out without added delay; requests made
+    before that tick (or `max_batch` of them) share one flush. Each
+    caller still awaits and receives only its own reply.
+    """
+    
+    def __init__(
+        self,
+        client: "KioskNATSClient | CodecHandle",
+        max_batch: int = 32,
+        timeout: float = 5.0
+    ):
+        self.client = client
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue: deque[tuple[str, NATSMessage, asyncio.Future]] = deque()
+        self._pending: Optional[asyncio.Handle] = None
+        self._flushes: set[asyncio.Task] = set()
+    
+    async def request(self, subject: str, message: NATSMessage) -> NATSMessage:
+        """Queue a request for the next batch and wait for its reply."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((subject, message, future))
+        
+        if len(self._queue) >= self.max_batch:
+            self._flush_now()
+        elif self._pending is None:
+            self._pending = loop.call_soon(self._flush_now)
+        
+        return await future
+    
+    def _flush_now(self) -> None:
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        task = asyncio.create_task(self._flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+    
+    async def _flush(self) -> None:
+        """Send everything queued so far and resolve the callers' futures."""
+        batch = list(self._queue)
+        self._queue.clear()
+        if not batch:
+            return
+        
+        try:
+            results = await self.client.request_many(
+                [(subject, message) for subject, message, _ in batch],
+                timeout=self.timeout,
+                return_exceptions=True
+            )
+        except Exception as e:
+            results = [e] * len(batch)
+        
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue  # Caller gave up
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+# ============================================================
+# Connection Sharing
+# ============================================================
+
+# server url -> client; see KioskNATSClient.shared()
+_shared_clients: dict[str, KioskNATSClient] = {}
+
+
+def get_shared_client(name: str) -> KioskNATSClient:
+    """
+    Get the process-wide client for the default server.
+    
+    `name` labels the connection if this call creates it. Each user still
+    calls connect()/disconnect(), which are refcounted.
+    """
+    return KioskNATSClient.shared(NATSConfig(name=name))
+
+
+class CodecHandle:
+    """
+    A component's handle on a shared KioskNATSClient with its own outgoing codec.
+    
+    publish/request calls encode with this handle's codec; everything else
+    (connection, subscriptions, connect()/disconnect() refcount, run loop)
+    is the shared client's. Replies always use the requester's format.
+    """
+    
+    def __init__(self, client: KioskNATSClient, codec: str):
+        self.client = client
+        self.codec = get_codec(codec)
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+    
+    async def publish(self, subject: str, message: NATSMessage) -> None:
+        await self.client.publish(subject, message, codec=self.codec)
+    
+    async def publish_batch(self, items: list[tuple[str, NATSMessage]]) -> None:
+        await self.client.publish_batch(items, codec=self.codec)
+    
+    async def request(
+        self,
+        subject: str,
+        message: NATSMessage,
+        timeout: float = 5.0
+    ) -> NATSMessage:
+        return await self.client.request(subject, message, timeout, codec=self.codec)
+    
+    async def request_many(
+        self,
+        items: list[tuple[str, NATSMessage]],
+        timeout: float = 5.0,
+        return_exceptions: bool = False
+    ) -> list:
+        return await self.client.request_many(
+            items, timeout, return_exceptions, codec=self.codec
+        )
@@ -4,24 +4,61 @@ NATS Message Envelope
 Standardized message format for all kiosk components.
 """
 
-import json
-import uuid
-from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+import os
+import time
+from abc import ABC, abstractmethod
+from binascii import hexlify
+from dataclasses import dataclass, field
 from typing import Any, Optional
 
+import msgpack
+import orjson
 
-@dataclass
+
+_urandom = os.urandom
+
+# Accept non-str dict keys (e.g. int item ids) the way json.dumps does
+_JSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+# Whole-second part of the last timestamp, reformatted once per second
+_ts_second = -1
+_ts_prefix = ""
+
+
+def _new_id() -> str:
+    """Generate a random 128-bit identifier as 32 hex characters."""
+    return _urandom(16).hex()
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time in the format of datetime.isoformat()."""
+    global _ts_second, _ts_prefix
+    now = time.time()
+    second = int(now)
+    if second != _ts_second:
+        _ts_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        _ts_second = second
+    return f"{_ts_prefix}.{int((now - second) * 1_000_000):06d}+00:00"
+
+
+@dataclass(slots=True)
 class NATSMessage:
     """Standard message envelope for all NATS communication."""
     
-    msg_id: str = field(default_factory=lambda: str(uuid.uuid4()))
-    timestamp: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    msg_id: str = field(default_factory=_new_id)
+    timestamp: str = field(default_factory=_utc_timestamp)
     session_id: str = ""
-    trace_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    trace_id: str = field(default_factory=_new_id)
     version: str = "1.0"
     payload: dict = field(default_factory=dict)
     
+    # Codec the message arrived in (not sent on the wire); replies reuse it
+    content_type: str = field(default="json", repr=False, compare=False)
+    
+    # Encoded form, reused across publishes; see invalidate()
+    _cached_bytes: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
+    _cached_codec: Optional["WireCodec"] = field(default=None, init=False, repr=False, compare=False)
+    
     @classmethod
     def create(
         cls,
@@ -32,36 +69,183 @@ class NATSMessage:
         """Create a new message with auto-generated IDs."""
         return cls(
             session_id=session_id,
-            trace_id=trace_id or str(uuid.uuid4()),
+            trace_id=trace_id or _new_id(),
             payload=payload
         )
     
+    def invalidate(self) -> None:
+        """
+        Drop the cached encoding.
+        
+        Must be called after mutating any field (including the payload
+        dict in place) on a message that has already been serialized.
+        """
+        self._cached_bytes = None
+        self._cached_codec = None
+    
+    def to_dict(self) -> dict:
+        """Return the envelope as a plain dict (payload is not copied)."""
+        return {
+            "msg_id": self.msg_id,
+            "timestamp": self.timestamp,
+            "session_id": self.session_id,
+            "trace_id": self.trace_id,
+            "version": self.version,
+            "payload": self.payload,
+        }
+    
     def to_json(self) -> str:
         """Serialize message to JSON string."""
-        return json.dumps(asdict(self))
+        return self.to_bytes().decode('utf-8')
     
     def to_bytes(self) -> bytes:
-        """Serialize message to bytes for NATS."""
-        return self.to_json().encode('utf-8')
+        """Serialize message to JSON bytes for NATS."""
+        return JSON_CODEC.encode(self)
     
     @classmethod
     def from_bytes(cls, data: bytes) -> "NATSMessage":
-        """Deserialize message from NATS bytes."""
-        obj = json.loads(data.decode('utf-8'))
-        return cls(**obj)
+        """Deserialize message from NATS JSON bytes."""
+        return JSON_CODEC.decode(data)
+    
+    @staticmethod
+    def payload_from_bytes(data: bytes) -> dict:
+        """Decode only the payload of NATS JSON bytes, skipping the envelope object."""
+        return JSON_CODEC.decode_payload(data)
     
     @classmethod
     def from_json(cls, json_str: str) -> "NATSMessage":
         """Deserialize message from JSON string."""
-        obj = json.loads(json_str)
-        return cls(**obj)
+        return cls(**orjson.loads(json_str))
+
+
+# ============================================================
+# Wire Codecs
+# ============================================================
+
+class WireCodec(ABC):
+    """Encodes NATSMessage envelopes to and from bytes on the wire."""
+    
+    name: str = ""
+    
+    def encode(self, message: NATSMessage) -> bytes:
+        """Serialize a message envelope, reusing its cached encoding."""
+        if message._cached_codec is not self:
+            message._cached_bytes = self.dumps(message.to_dict())
+            message._cached_codec = self
+        return message._cached_bytes
+    
+    def decode(self, data: bytes) -> NATSMessage:
+        """Deserialize a message envelope."""
+        return NATSMessage(content_type=self.name, **self.loads(data))
+    
+    def decode_payload(self, data: bytes) -> dict:
+        """Deserialize just the payload dict of a message envelope."""
+        return self.loads(data)["payload"]
+    
+    @abstractmethod
+    def dumps(self, obj: dict) -> bytes:
+        """Serialize an envelope dict to bytes."""
+    
+    @abstractmethod
+    def loads(self, data: bytes) -> dict:
+        """Deserialize bytes to an envelope dict."""
+
+
+class JsonCodec(WireCodec):
+    """JSON envelope (the format from the NATS specification)."""
+    
+    name = "json"
+    
+    def dumps(self, obj: dict) -> bytes:
+        return orjson.dumps(obj, option=_JSON_OPTIONS)
+    
+    def loads(self, data: bytes) -> dict:
+        return orjson.loads(data)
+
+
+class MsgpackCodec(WireCodec):
+    """MessagePack envelope: binary, schema-less, same field layout as JSON."""
+    
+    name = "msgpack"
+    
+    def dumps(self, obj: dict) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+    
+    def loads(self, data: bytes) -> dict:
+        # Accept non-str map keys, matching JSON's OPT_NON_STR_KEYS
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+JSON_CODEC = JsonCodec()
+MSGPACK_CODEC = MsgpackCodec()
+
+
+_CODECS: dict[str, WireCodec] = {
+    JSON_CODEC.name: JSON_CODEC,
+    MSGPACK_CODEC.name: MSGPACK_CODEC,
+}
+
+
+# First bytes of a JSON envelope; a msgpack envelope starts with a map header
+_JSON_LEAD_BYTES = frozenset(b"{ \t\r\n")
+
+
+def detect_codec(data: bytes) -> WireCodec:
+    """Pick the codec that produced received envelope bytes."""
+    if not data or data[0] in _JSON_LEAD_BYTES:
+        return JSON_CODEC
+    return MSGPACK_CODEC
+
+
+def decode_message(data: bytes) -> NATSMessage:
+    """Deserialize an envelope in whichever wire format it was sent."""
+    return detect_codec(data).decode(data)
+
+
+def decode_payload(data: bytes) -> dict:
+    """Deserialize just the payload, in whichever wire format it was sent."""
+    return detect_codec(data).decode_payload(data)
+
+
+def get_codec(name: str) -> WireCodec:
+    """Look up a wire codec by name ("json" or "msgpack")."""
+    codec = _CODECS.get(name)
+    if codec is None:
+        raise ValueError(f"Unknown wire codec: {name}")
+    return codec
+
+
+class EnvelopeTemplate:
+    """
+    Pre-encoded JSON envelope for a fixed session.
+    
+    For high-rate publishers that build their payload JSON directly from a
+    byte template: frame() adds fresh ids and a timestamp around it without
+    constructing a NATSMessage.
+    """
+    
+    def __init__(self, session_id: str = ""):
+        self._template = (
+            b'{"msg_id":"%b","timestamp":"%b","session_id":'
+            + orjson.dumps(session_id, option=_JSON_OPTIONS)
+            + b',"trace_id":"%b","version":"1.0","payload":%b}'
+        )
+    
+    def frame(self, payload: bytes) -> bytes:
+        """Wrap an already JSON-encoded payload object in the envelope."""
+        return self._template % (
+            hexlify(_urandom(16)),
+            _utc_timestamp().encode('ascii'),
+            hexlify(_urandom(16)),
+            payload,
+        )
 
 
 # ============================================================
 # Event Payloads
 # ============================================================
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PersonDetectedPayload:
     """Payload for vision.person_detected event."""
     event: str = "person_detected"
@@ -71,7 +255,7 @@ class PersonDetectedPayload:
     estimated_party_size: int = 1
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TranscriptPayload:
     """Payload for voice.transcript event."""
     event: str = "transcript"
@@ -81,7 +265,7 @@ class TranscriptPayload:
     is_final: bool = True
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class IntentPayload:
     """Payload for voice.intent event."""
     event: str = "intent"
@@ -95,7 +279,7 @@ class IntentPayload:
 # Command/Request Payloads
 # ============================================================
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MenuSearchRequest:
     """Request payload for menu.search command."""
     command: str = "search"
@@ -105,7 +289,7 @@ class MenuSearchRequest:
     limit: int = 10
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MenuSearchResponse:
     """Response payload for menu.search command."""
     status: str = "success"
@@ -113,7 +297,7 @@ class MenuSearchResponse:
     total_matches: int = 0
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class RecsysSuggestRequest:
     """Request payload for recsys.suggest command."""
     command: str = "suggest"
@@ -121,7 +305,7 @@ class RecsysSuggestRequest:
     context: dict = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class RecsysSuggestResponse:
     """Response payload for recsys.suggest command."""
     status: str = "success"
@@ -137,11 +321,14 @@ def create_event(
     payload: dict,
     session_id: str = ""
 ) -> NATSMessage:
-    """Create an event message."""
-    return NATSMessage.create(
-        payload={"event": event_type, **payload},
-        session_id=session_id
-    )
+    """
+    Create an event message.
+    
+    The payload dict is taken over and tagged in place; callers must not
+    reuse it afterwards (use create_event_copy for shared dicts).
+    """
+    payload["event"] = event_type
+    return NATSMessage.create(payload=payload, session_id=session_id)
 
 
 def create_request(
@@ -149,11 +336,14 @@ def create_request(
     payload: dict,
     session_id: str = ""
 ) -> NATSMessage:
-    """Create a request message."""
-    return NATSMessage.create(
-        payload={"command": command, **payload},
-        session_id=session_id
-    )
+    """
+    Create a request message.
+    
+    The payload dict is taken over and tagged in place; callers must not
+    reuse it afterwards (use create_request_copy for shared dicts).
+    """
+    payload["command"] = command
+    return NATSMessage.create(payload=payload, session_id=session_id)
 
 
 def create_response(
@@ -161,9 +351,42 @@ def create_response(
     payload: dict,
     original_msg: NATSMessage
 ) -> NATSMessage:
-    """Create a response message, preserving trace_id."""
+    """
+    Create a response message, preserving trace_id.
+    
+    The payload dict is taken over and tagged in place; callers must not
+    reuse it afterwards (use create_response_copy for shared dicts).
+    """
+    payload["status"] = status
     return NATSMessage.create(
-        payload={"status": status, **payload},
+        payload=payload,
         session_id=original_msg.session_id,
         trace_id=original_msg.trace_id
     )
+
+
+def create_event_copy(
+    event_type: str,
+    payload: dict,
+    session_id: str = ""
+) -> NATSMessage:
+    """Create an event message without modifying the given payload."""
+    return create_event(event_type, {**payload}, session_id)
+
+
+def create_request_copy(
+    command: str,
+    payload: dict,
+    session_id: str = ""
+) -> NATSMessage:
+    """Create a request message without modifying the given payload."""
+    return create_request(command, {**payload}, session_id)
+
+
+def create_response_copy(
+    status: str,
+    payload: dict,
+    original_msg: NATSMessage
+) -> NATSMessage:
+    """Create a response message without modifying the given payload."""
+    return create_response(status, {**payload}, original_msg)
@@ -14,7 +14,7 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
-from common.client import KioskNATSClient, NATSConfig
+from common.client import get_shared_client, run
 from common.message import NATSMessage, create_event, create_request
 
 
@@ -27,9 +27,7 @@ class IntegrationTest:
     """
     
     def __init__(self):
-        self.client = KioskNATSClient(
-            config=NATSConfig(name="integration-test")
-        )
+        self.client = get_shared_client("integration-test")
         self.session_id = "test-session-001"
         self.results = []
     
@@ -217,10 +215,12 @@ class IntegrationTest:
             import time
             start = time.time()
             
-            # Execute in parallel
-            menu_response, recsys_response = await asyncio.gather(
-                self.client.request("kiosk.agent.menu.search", menu_request),
-                self.client.request("kiosk.agent.recsys.suggest", recsys_request),
+            # Execute in parallel, both requests sent in one flush
+            menu_response, recsys_response = await self.client.request_many(
+                [
+                    ("kiosk.agent.menu.search", menu_request),
+                    ("kiosk.agent.recsys.suggest", recsys_request),
+                ],
                 return_exceptions=True
             )
             
@@ -261,27 +261,35 @@ class IntegrationTest:
         console.print("\n[bold]Test 5: Pub/Sub Events[/bold]")
         
         received_events = []
+        all_received = asyncio.Event()
         
-        async def event_handler(msg: NATSMessage, subject: str):
-            received_events.append((subject, msg))
-        
-        # Subscribe
-        await self.client.subscribe("kiosk.test.>", event_handler)
+        async def event_handler(payload: dict, subject: str):
+            received_events.append((subject, payload))
+            if len(received_events) >= 3:
+                all_received.set()
         
-        # Give subscription time to establish
-        await asyncio.sleep(0.1)
+        # Subscribe; the flush round-trip confirms the server has it
+        await self.client.subscribe("kiosk.test.>", event_handler, payload_only=True)
+        await self.client.nc.flush()
         
-        # Publish test events
-        for i in range(3):
-            event = create_event(
-                event_type="test_event",
-                payload={"index": i},
-                session_id=self.session_id
+        # Publish test events in a single batch
+        await self.client.publish_batch([
+            (
+                f"kiosk.test.event_{i}",
+                create_event(
+                    event_type="test_event",
+                    payload={"index": i},
+                    session_id=self.session_id
+                )
             )
-            await self.client.publish(f"kiosk.test.event_{i}", event)
+            for i in range(3)
+        ])
         
         # Wait for events to be received
-        await asyncio.sleep(0.5)
+        try:
+            await asyncio.wait_for(all_received.wait(), timeout=2.0)
+        except asyncio.TimeoutError:
+            pass
         
         passed = len(received_events) == 3
         
@@ -355,4 +363,4 @@ Prerequisites:
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
@@ -5,11 +5,23 @@ Simulates Vision and Voice agents publishing events.
 Use this to test the Orchestrator's event handling.
 """
 
-import asyncio
+import logging
 import random
 
-from common.client import KioskNATSClient, NATSConfig
-from common.message import NATSMessage, create_event
+from common.client import get_shared_client, run
+from common.message import EnvelopeTemplate, NATSMessage, create_event
+
+
+# Pre-encoded payloads for the high-rate vision events
+_PERSON_DETECTED_TEMPLATE = (
+    b'{"event":"person_detected","confidence":%f,"face_detected":true,'
+    b'"estimated_age_group":"%b","estimated_party_size":%d,'
+    b'"bounding_box":{"x":100,"y":50,"w":200,"h":400}}'
+)
+_GAZE_DETECTED_TEMPLATE = (
+    b'{"event":"gaze_detected","looking_at_screen":%b,"gaze_point":{"x":%d,"y":%d}}'
+)
+_AGE_GROUPS = (b"child", b"adult", b"senior")
 
 
 class MockEventPublisher:
@@ -18,10 +30,9 @@ class MockEventPublisher:
     """
     
     def __init__(self):
-        self.client = KioskNATSClient(
-            config=NATSConfig(name="mock-event-publisher")
-        )
+        self.client = get_shared_client("mock-event-publisher")
         self.session_id = "test-session-001"
+        self._envelope = EnvelopeTemplate(self.session_id)
     
     async def connect(self):
         """Connect to NATS."""
@@ -37,18 +48,15 @@ class MockEventPublisher:
     
     async def publish_person_detected(self, party_size: int = 1):
         """Simulate a person being detected."""
-        event = create_event(
-            event_type="person_detected",
-            payload={
-                "confidence": random.uniform(0.85, 0.99),
-                "face_detected": True,
-                "estimated_age_group": random.choice(["child", "adult", "senior"]),
-                "estimated_party_size": party_size,
-                "bounding_box": {"x": 100, "y": 50, "w": 200, "h": 400}
-            },
-            session_id=self.session_id
+        payload = _PERSON_DETECTED_TEMPLATE % (
+            random.uniform(0.85, 0.99),
+            random.choice(_AGE_GROUPS),
+            party_size
+        )
+        await self.client.publish_raw(
+            "kiosk.vision.person_detected",
+            self._envelope.frame(payload)
         )
-        await self.client.publish("kiosk.vision.person_detected", event)
     
     async def publish_person_left(self):
         """Simulate a person leaving."""
@@ -61,15 +69,15 @@ class MockEventPublisher:
     
     async def publish_gaze_detected(self, looking_at_screen: bool = True):
         """Simulate gaze detection."""
-        event = create_event(
-            event_type="gaze_detected",
-            payload={
-                "looking_at_screen": looking_at_screen,
-                "gaze_point": {"x": random.randint(0, 1920), "y": random.randint(0, 1080)}
-            },
-            session_id=self.session_id
+        payload = _GAZE_DETECTED_TEMPLATE % (
+            b"true" if looking_at_screen else b"false",
+            random.randint(0, 1920),
+            random.randint(0, 1080)
+        )
+        await self.client.publish_raw(
+            "kiosk.vision.gaze_detected",
+            self._envelope.frame(payload)
         )
-        await self.client.publish("kiosk.vision.gaze_detected", event)
     
     # ========================================
     # Voice Events
@@ -179,8 +187,9 @@ async def interactive_publisher():
 
 
 async def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     await interactive_publisher()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
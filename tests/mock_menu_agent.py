@@ -5,11 +5,19 @@ Simulates the Menu Agent for testing NATS communication.
 Responds to menu search and details requests.
 """
 
-import asyncio
-from dataclasses import asdict
+import heapq
+import logging
+import re
+import sys
+from collections import defaultdict
+from functools import lru_cache
+from types import MappingProxyType
 
-from common.client import KioskNATSClient, NATSConfig
-from common.message import NATSMessage, create_response
+from common.client import KioskNATSClient, NATSConfig, run
+from common.message import NATSMessage, create_response, create_response_copy
+
+
+log = logging.getLogger("mock-menu-agent")
 
 
 # Mock menu database
@@ -71,36 +79,101 @@ MOCK_MENU = [
     },
 ]
 
+# ============================================================
+# Search Index (built once at import)
+# ============================================================
+
+# Tags and allergens come from a small vocabulary: store them as tuples of
+# interned strings so all index keys and item fields share one object each
+for _item in MOCK_MENU:
+    _item["tags"] = tuple(sys.intern(tag) for tag in _item["tags"])
+    _item["allergens"] = tuple(sys.intern(allergen) for allergen in _item["allergens"])
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def _tokenize(text: str) -> list[str]:
+    """Split text into lowercase alphanumeric words."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+_ITEM_BY_ID: dict[int, dict] = {item["id"]: item for item in MOCK_MENU}
+
+# Search result shape per item, shared read-only across responses
+_SUMMARY_BY_ID: dict[int, dict] = {
+    item["id"]: {
+        "id": item["id"],
+        "name": item["name"],
+        "price": item["price"],
+        "image": item["image"],
+        "tags": item["tags"],
+        "available": item["available"]
+    }
+    for item in MOCK_MENU
+}
+
+# id -> (lowercase name, lowercase description), for phrase matching
+_SEARCH_TEXT_BY_ID: dict[int, tuple[str, str]] = {
+    item["id"]: (item["name"].lower(), item["description"].lower())
+    for item in MOCK_MENU
+}
+
+_NO_IDS: frozenset[int] = frozenset()
+
+# Shared "not found" payload, read-only; each miss sends a copy
+_ITEM_NOT_FOUND = MappingProxyType({
+    "error_code": "ITEM_NOT_FOUND",
+    "error_message": "Item not found"
+})
+
+# word -> ids of items whose name or description contains it
+_WORD_INDEX: dict[str, set[int]] = defaultdict(set)
+# tag -> ids of items carrying it
+_TAG_INDEX: dict[str, set[int]] = defaultdict(set)
+
+for _item in MOCK_MENU:
+    for _word in _tokenize(_item["name"] + " " + _item["description"]):
+        _WORD_INDEX[sys.intern(_word)].add(_item["id"])
+    for _tag in _item["tags"]:
+        _TAG_INDEX[_tag].add(_item["id"])
+del _item, _word, _tag
+
+_WORD_INDEX = dict(_WORD_INDEX)
+_TAG_INDEX = dict(_TAG_INDEX)
+
+
+@lru_cache(maxsize=1024)
+def _ids_matching(token: str) -> frozenset[int]:
+    """Ids of items with an indexed word containing `token` (e.g. "burger" in "cheeseburger")."""
+    ids = set()
+    for word, word_ids in _WORD_INDEX.items():
+        if token in word:
+            ids |= word_ids
+    return frozenset(ids)
+
 
 class MockMenuAgent:
     """Mock Menu Agent that responds to search and details requests."""
     
     def __init__(self):
-        self.client = KioskNATSClient(
-            config=NATSConfig(name="mock-menu-agent")
+        self.client = KioskNATSClient.shared(
+            NATSConfig(name="mock-menu-agent")
         )
     
     async def start(self):
         """Start the mock agent."""
         await self.client.connect()
         
-        # Register handlers for menu commands
-        await self.client.reply_handler(
-            "kiosk.agent.menu.search",
-            self.handle_search,
-            queue="menu-agents"  # Queue group for load balancing
-        )
-        
-        await self.client.reply_handler(
-            "kiosk.agent.menu.details",
-            self.handle_details,
-            queue="menu-agents"
-        )
-        
-        await self.client.reply_handler(
-            "kiosk.agent.menu.availability",
-            self.handle_availability,
-            queue="menu-agents"
+        # Register handlers for menu commands on one wildcard subscription
+        await self.client.reply_handler_multi(
+            "kiosk.agent.menu",
+            {
+                "search": self.handle_search,
+                "details": self.handle_details,
+                "availability": self.handle_availability,
+            },
+            queue="menu-agents",  # Queue group for load balancing
+            max_inflight=32
         )
         
         print("\n🍔 Mock Menu Agent ready!\n")
@@ -108,38 +181,41 @@ class MockMenuAgent:
     
     async def handle_search(self, request: NATSMessage) -> NATSMessage:
         """Handle menu search requests."""
-        query = request.payload.get("query", "").lower()
-        tags = request.payload.get("tags", [])
-        dietary_filters = request.payload.get("dietary_filters", [])
-        limit = request.payload.get("limit", 10)
+        payload = request.payload
+        query = payload.get("query", "").lower()
+        tags = payload.get("tags", [])
+        dietary_filters = payload.get("dietary_filters", [])
+        limit = payload.get("limit", 10)
+        
+        # Tag filters first: set unions over the tag index, and usually the
+        # most selective constraint
+        candidate_ids = set(_ITEM_BY_ID)
+        if tags:
+            tagged = set()
+            for tag in tags:
+                tagged |= _TAG_INDEX.get(tag, _NO_IDS)
+            candidate_ids &= tagged
         
-        # Filter items
-        results = []
-        for item in MOCK_MENU:
-            # Match query in name or description
-            if query and query not in item["name"].lower() and query not in item["description"].lower():
-                continue
-            
-            # Match tags
-            if tags and not any(tag in item["tags"] for tag in tags):
-                continue
-            
-            # Match dietary filters
-            if dietary_filters:
-                if "vegetarian" in dietary_filters and "vegetarian" not in item["tags"]:
-                    continue
-            
-            results.append({
-                "id": item["id"],
-                "name": item["name"],
-                "price": item["price"],
-                "image": item["image"],
-                "tags": item["tags"],
-                "available": item["available"]
-            })
-            
-            if len(results) >= limit:
-                break
+        # Match dietary filters
+        if "vegetarian" in dietary_filters:
+            candidate_ids &= _TAG_INDEX.get("vegetarian", _NO_IDS)
+        
+        # Match the query as one substring of name or description. An item
+        # can only contain the phrase if it has a word containing each query
+        # word, so the word index narrows the candidates before the scan.
+        if query:
+            for token in _tokenize(query):
+                if not candidate_ids:
+                    break
+                candidate_ids &= _ids_matching(token)
+            candidate_ids = {
+                item_id for item_id in candidate_ids
+                if query in _SEARCH_TEXT_BY_ID[item_id][0]
+                or query in _SEARCH_TEXT_BY_ID[item_id][1]
+            }
+        
+        # First `limit` ids in catalog order, without sorting all candidates
+        results = [_SUMMARY_BY_ID[item_id] for item_id in heapq.nsmallest(limit, candidate_ids)]
         
         return create_response(
             status="success",
@@ -154,20 +230,18 @@ class MockMenuAgent:
         """Handle item details requests."""
         item_id = request.payload.get("item_id")
         
-        for item in MOCK_MENU:
-            if item["id"] == item_id:
-                return create_response(
-                    status="success",
-                    payload={"item": item},
-                    original_msg=request
-                )
+        item = _ITEM_BY_ID.get(item_id)
+        if item is not None:
+            return create_response(
+                status="success",
+                payload={"item": item},
+                original_msg=request
+            )
         
-        return create_response(
+        log.info("Item %s not found", item_id)
+        return create_response_copy(
             status="error",
-            payload={
-                "error_code": "ITEM_NOT_FOUND",
-                "error_message": f"Item {item_id} not found"
-            },
+            payload=_ITEM_NOT_FOUND,
             original_msg=request
         )
     
@@ -175,25 +249,24 @@ class MockMenuAgent:
         """Handle availability check requests."""
         item_id = request.payload.get("item_id")
         
-        for item in MOCK_MENU:
-            if item["id"] == item_id:
-                return create_response(
-                    status="success",
-                    payload={"item_id": item_id, "available": item["available"]},
-                    original_msg=request
-                )
+        item = _ITEM_BY_ID.get(item_id)
+        if item is not None:
+            return create_response(
+                status="success",
+                payload={"item_id": item_id, "available": item["available"]},
+                original_msg=request
+            )
         
-        return create_response(
+        log.info("Item %s not found", item_id)
+        return create_response_copy(
             status="error",
-            payload={
-                "error_code": "ITEM_NOT_FOUND",
-                "error_message": f"Item {item_id} not found"
-            },
+            payload=_ITEM_NOT_FOUND,
             original_msg=request
         )
 
 
 async def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     agent = MockMenuAgent()
     try:
         await agent.start()
@@ -202,4 +275,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
@@ -6,10 +6,15 @@ Subscribes to events and sends requests to agents.
 """
 
 import asyncio
+import logging
+import time
 from typing import Optional
 
-from common.client import KioskNATSClient, NATSConfig
-from common.message import NATSMessage, create_event, create_request
+from common.client import BatchedRequester, KioskNATSClient, NATSConfig, run
+from common.message import create_event, create_request
+
+
+log = logging.getLogger("mock-orchestrator")
 
 
 class MockOrchestrator:
@@ -21,11 +26,16 @@ class MockOrchestrator:
     """
     
     def __init__(self):
-        self.client = KioskNATSClient(
-            config=NATSConfig(name="mock-orchestrator")
+        self.client = KioskNATSClient.shared(
+            NATSConfig(name="mock-orchestrator", codec="msgpack")
         )
+        self.requester = BatchedRequester(self.client)
         self.session_id = "test-session-001"
         self.current_state = "idle"
+        
+        # (query, cart item ids, context) -> (stored_at, (items, suggestions))
+        self._search_cache: dict[tuple, tuple[float, tuple]] = {}
+        self._search_ttl = 5.0
     
     async def start(self):
         """Start the orchestrator."""
@@ -34,19 +44,22 @@ class MockOrchestrator:
         # Subscribe to vision events
         await self.client.subscribe(
             "kiosk.vision.>",
-            self.handle_vision_event
+            self.handle_vision_event,
+            payload_only=True
         )
         
         # Subscribe to voice events
         await self.client.subscribe(
             "kiosk.voice.>",
-            self.handle_voice_event
+            self.handle_voice_event,
+            payload_only=True
         )
         
         # Subscribe to input events (from frontend)
         await self.client.subscribe(
             "kiosk.input.>",
-            self.handle_input_event
+            self.handle_input_event,
+            payload_only=True
         )
         
         print("\n🧠 Mock Orchestrator ready!\n")
@@ -55,63 +68,87 @@ class MockOrchestrator:
         
         await self.client.run_forever()
     
-    async def handle_vision_event(self, msg: NATSMessage, subject: str):
+    async def handle_vision_event(self, payload: dict, subject: str):
         """Handle vision events."""
-        event = msg.payload.get("event")
+        event = payload.get("event")
         
         if event == "person_detected":
-            print(f"\n👁️ Vision: Person detected!")
-            print(f"   Confidence: {msg.payload.get('confidence', 0):.0%}")
-            print(f"   Party size: {msg.payload.get('estimated_party_size', 1)}")
-            
             # Transition to attract state
             self.current_state = "attract"
-            print(f"   → State: {self.current_state}")
+            if log.isEnabledFor(logging.INFO):
+                log.info(
+                    "\n👁️ Vision: Person detected!\n   Confidence: %.0f%%\n   Party size: %s\n   → State: %s",
+                    payload.get("confidence", 0) * 100,
+                    payload.get("estimated_party_size", 1),
+                    self.current_state
+                )
         
         elif event == "person_left":
-            print(f"\n👋 Vision: Person left")
             self.current_state = "idle"
-            print(f"   → State: {self.current_state}")
+            if log.isEnabledFor(logging.INFO):
+                log.info("\n👋 Vision: Person left\n   → State: %s", self.current_state)
     
-    async def handle_voice_event(self, msg: NATSMessage, subject: str):
+    async def handle_voice_event(self, payload: dict, subject: str):
         """Handle voice events."""
-        event = msg.payload.get("event")
+        event = payload.get("event")
         
         if event == "transcript":
-            text = msg.payload.get("text", "")
-            print(f"\n🎤 Voice: \"{text}\"")
-            print(f"   Confidence: {msg.payload.get('confidence', 0):.0%}")
+            text = payload.get("text", "")
+            if log.isEnabledFor(logging.INFO):
+                log.info(
+                    "\n🎤 Voice: \"%s\"\n   Confidence: %.0f%%",
+                    text,
+                    payload.get("confidence", 0) * 100
+                )
             
             # Simple intent detection (in real system, would use Gemini)
             if "burger" in text.lower():
                 await self.search_menu("burger")
         
         elif event == "intent":
-            intent = msg.payload.get("intent_type")
-            print(f"\n💭 Intent: {intent}")
-            print(f"   Entities: {msg.payload.get('entities', {})}")
+            intent = payload.get("intent_type")
+            entities = payload.get("entities", {})
+            if log.isEnabledFor(logging.INFO):
+                log.info("\n💭 Intent: %s\n   Entities: %s", intent, entities)
             
             if intent == "search_menu":
-                query = msg.payload.get("entities", {}).get("item", "")
+                query = entities.get("item", "")
                 await self.search_menu(query)
     
-    async def handle_input_event(self, msg: NATSMessage, subject: str):
+    async def handle_input_event(self, payload: dict, subject: str):
         """Handle touch/input events from frontend."""
-        action = msg.payload.get("action")
+        action = payload.get("action")
+        item_id = payload.get("item_id")
         
         if action == "select_item":
-            item_id = msg.payload.get("item_id")
-            print(f"\n👆 Touch: Selected item {item_id}")
+            if log.isEnabledFor(logging.INFO):
+                log.info("\n👆 Touch: Selected item %s", item_id)
             await self.get_item_details(item_id)
         
         elif action == "add_to_cart":
-            item_id = msg.payload.get("item_id")
-            print(f"\n🛒 Cart: Added item {item_id}")
+            if log.isEnabledFor(logging.INFO):
+                log.info("\n🛒 Cart: Added item %s", item_id)
     
     async def search_menu(self, query: str):
         """Send search request to Menu Agent and get suggestions."""
-        print(f"\n🔍 Searching for: {query}")
-        print("-" * 40)
+        if log.isEnabledFor(logging.INFO):
+            log.info("\n🔍 Searching for: %s\n%s", query, "-" * 40)
+        
+        cart = []
+        context = {"weather": "hot"}
+        
+        # Serve repeated searches from the cache
+        cache_key = (
+            query,
+            tuple(item.get("item_id") for item in cart),
+            tuple(sorted(context.items()))
+        )
+        cached = self._search_cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < self._search_ttl:
+            items, suggestions = cached[1]
+            self._show_items(items)
+            self._show_suggestions(suggestions)
+            return
         
         # Execute menu search and recsys suggest in parallel
         search_request = create_request(
@@ -122,39 +159,73 @@ class MockOrchestrator:
         
         suggest_request = create_request(
             command="suggest",
-            payload={"cart": [], "context": {"weather": "hot"}},
+            payload={"cart": cart, "context": context},
             session_id=self.session_id
         )
         
-        # Parallel execution
+        # Parallel execution; render each result as soon as it arrives
+        menu_task = asyncio.create_task(
+            self.requester.request("kiosk.agent.menu.search", search_request)
+        )
+        recsys_task = asyncio.create_task(
+            self.requester.request("kiosk.agent.recsys.suggest", suggest_request)
+        )
+        
+        # Process menu results
+        items = None
         try:
-            menu_response, recsys_response = await asyncio.gather(
-                self.client.request("kiosk.agent.menu.search", search_request),
-                self.client.request("kiosk.agent.recsys.suggest", suggest_request),
-                return_exceptions=True
-            )
-            
-            # Process menu results
-            if isinstance(menu_response, NATSMessage):
+            menu_response = await menu_task
+            if menu_response.payload.get("status") == "success":
                 items = menu_response.payload.get("items", [])
-                print(f"\n📋 Menu Results ({len(items)} items):")
-                for item in items:
-                    print(f"   • {item['name']} - ${item['price']}")
+                self._show_items(items)
             else:
-                print(f"❌ Menu search failed: {menu_response}")
-            
-            # Process recommendations
-            if isinstance(recsys_response, NATSMessage):
+                log.error("❌ Menu search failed: %s", menu_response.payload.get("error_message"))
+        except asyncio.TimeoutError:
+            log.error("❌ Menu search timed out")
+        except Exception as e:
+            log.error("❌ Menu search failed: %s", e)
+        
+        # Process recommendations
+        suggestions = None
+        try:
+            recsys_response = await recsys_task
+            if recsys_response.payload.get("status") == "success":
                 suggestions = recsys_response.payload.get("suggestions", [])
-                if suggestions:
-                    print(f"\n💡 Suggestions:")
-                    for s in suggestions:
-                        print(f"   • {s['name']}: {s['pitch']}")
+                self._show_suggestions(suggestions)
             else:
-                print(f"❌ Recsys failed: {recsys_response}")
-        
+                log.error("❌ Recsys failed: %s", recsys_response.payload.get("error_message"))
         except asyncio.TimeoutError:
-            print("❌ Request timed out")
+            log.error("❌ Recsys timed out")
+        except Exception as e:
+            log.error("❌ Recsys failed: %s", e)
+        
+        # Only cache when both agents replied with success
+        if items is not None and suggestions is not None:
+            self._cache_search(cache_key, items, suggestions)
+    
+    def _cache_search(self, key: tuple, items: list, suggestions: list):
+        """Remember a search result, dropping expired entries when the cache grows."""
+        now = time.monotonic()
+        if len(self._search_cache) >= 256:
+            self._search_cache = {
+                k: v for k, v in self._search_cache.items()
+                if now - v[0] < self._search_ttl
+            }
+        self._search_cache[key] = (now, (items, suggestions))
+    
+    def _show_items(self, items: list):
+        if log.isEnabledFor(logging.INFO):
+            lines = [f"\n📋 Menu Results ({len(items)} items):"]
+            for item in items:
+                lines.append(f"   • {item['name']} - ${item['price']}")
+            log.info("\n".join(lines))
+    
+    def _show_suggestions(self, suggestions: list):
+        if suggestions and log.isEnabledFor(logging.INFO):
+            lines = ["\n💡 Suggestions:"]
+            for s in suggestions:
+                lines.append(f"   • {s['name']}: {s['pitch']}")
+            log.info("\n".join(lines))
     
     async def get_item_details(self, item_id: int):
         """Get details for a specific item."""
@@ -165,26 +236,31 @@ class MockOrchestrator:
         )
         
         try:
-            response = await self.client.request(
+            response = await self.requester.request(
                 "kiosk.agent.menu.details",
                 request
             )
             
-            if response.payload.get("status") == "success":
-                item = response.payload.get("item", {})
-                print(f"\n📄 Item Details:")
-                print(f"   Name: {item.get('name')}")
-                print(f"   Price: ${item.get('price')}")
-                print(f"   Description: {item.get('description')}")
-                print(f"   Calories: {item.get('calories')}")
+            payload = response.payload
+            if payload.get("status") == "success":
+                if log.isEnabledFor(logging.INFO):
+                    item = payload.get("item", {})
+                    log.info(
+                        "\n📄 Item Details:\n   Name: %s\n   Price: $%s\n   Description: %s\n   Calories: %s",
+                        item.get("name"),
+                        item.get("price"),
+                        item.get("description"),
+                        item.get("calories")
+                    )
             else:
-                print(f"❌ Error: {response.payload.get('error_message')}")
+                log.error("❌ Error: %s", payload.get("error_message"))
         
         except asyncio.TimeoutError:
-            print("❌ Request timed out")
+            log.error("❌ Request timed out")
 
 
 async def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     orchestrator = MockOrchestrator()
     try:
         await orchestrator.start()
@@ -193,4 +269,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
@@ -6,12 +6,21 @@ Provides upsell suggestions based on cart contents.
 """
 
 import asyncio
+import logging
+import os
 import random
+import re
+from collections import defaultdict
+from functools import lru_cache
 
-from common.client import KioskNATSClient, NATSConfig
+from common.client import KioskNATSClient, NATSConfig, run
 from common.message import NATSMessage, create_response
 
 
+# Simulated processing delay, off by default so load tests measure the agent
+_SIM_DELAY = int(os.getenv("MOCK_RECSYS_DELAY_MS", "0")) / 1000
+
+
 # Suggestion rules
 SUGGESTIONS = {
     "burger_combo": {
@@ -39,12 +48,60 @@ SUGGESTIONS = {
 }
 
 
+# ============================================================
+# Rule Lookup Tables (built once at import)
+# ============================================================
+
+# trigger word -> keys of rules it fires
+_TRIGGER_TO_RULES: dict[str, list[str]] = defaultdict(list)
+# keys of rules with a context condition
+_CONTEXT_RULES: list[str] = []
+# rule key -> position in SUGGESTIONS, to keep suggestions in rule order
+_RULE_ORDER: dict[str, int] = {}
+# rule key -> suggestion dict, shared read-only across responses
+_RESPONSE_BY_RULE: dict[str, dict] = {}
+
+for _index, (_key, _rule) in enumerate(SUGGESTIONS.items()):
+    for _trigger in _rule.get("trigger", []):
+        _TRIGGER_TO_RULES[_trigger].append(_key)
+    if _rule.get("context"):
+        _CONTEXT_RULES.append(_key)
+    _RULE_ORDER[_key] = _index
+    _RESPONSE_BY_RULE[_key] = {
+        "item_id": _rule["item_id"],
+        "name": _rule["name"],
+        "pitch": _rule["pitch"],
+        "reason": _rule["reason"]
+    }
+del _index, _key, _rule, _trigger
+
+_TRIGGER_TO_RULES = dict(_TRIGGER_TO_RULES)
+
+
+# Splits cart names into words so each distinct word is matched (and
+# cached) once. Matching stays a substring test on purpose rather than an
+# exact-token set intersection: "Classic Cheeseburger" must still fire the
+# burger rules.
+_WORD_RE = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=1024)
+def _rules_for_word(word: str) -> tuple[str, ...]:
+    """Keys of rules whose trigger occurs in `word` (e.g. "burger" in "cheeseburger")."""
+    return tuple(
+        key
+        for trigger, keys in _TRIGGER_TO_RULES.items()
+        if trigger in word
+        for key in keys
+    )
+
+
 class MockRecsysAgent:
     """Mock Recommendation Agent that suggests upsells."""
     
     def __init__(self):
-        self.client = KioskNATSClient(
-            config=NATSConfig(name="mock-recsys-agent")
+        self.client = KioskNATSClient.shared(
+            NATSConfig(name="mock-recsys-agent")
         )
     
     async def start(self):
@@ -55,7 +112,8 @@ class MockRecsysAgent:
         await self.client.reply_handler(
             "kiosk.agent.recsys.suggest",
             self.handle_suggest,
-            queue="recsys-agents"
+            queue="recsys-agents",
+            max_inflight=32
         )
         
         print("\n💡 Mock Recommendation Agent ready!\n")
@@ -63,43 +121,46 @@ class MockRecsysAgent:
     
     async def handle_suggest(self, request: NATSMessage) -> NATSMessage:
         """Handle suggestion requests."""
-        cart = request.payload.get("cart", [])
-        context = request.payload.get("context", {})
-        
-        # Simulate processing delay
-        await asyncio.sleep(0.1)
+        payload = request.payload
+        cart = payload.get("cart", [])
+        context = payload.get("context", {})
         
-        suggestions = []
-        cart_item_names = [item.get("name", "").lower() for item in cart]
-        cart_item_ids = [item.get("item_id") for item in cart]
+        # Simulate processing delay (MOCK_RECSYS_DELAY_MS=100 for the old behavior)
+        if _SIM_DELAY:
+            await asyncio.sleep(_SIM_DELAY)
         
-        # Check each suggestion rule
-        for key, rule in SUGGESTIONS.items():
-            # Skip if already in cart
-            if rule["item_id"] in cart_item_ids:
-                continue
-            
-            # Check trigger items
-            trigger_match = any(
-                trigger in name 
-                for trigger in rule.get("trigger", [])
-                for name in cart_item_names
-            )
-            
-            # Check context match
-            context_rule = rule.get("context", {})
-            context_match = all(
-                context.get(k) == v 
-                for k, v in context_rule.items()
+        # Nothing to match against (every context rule has a non-empty context)
+        if not cart and not context:
+            return create_response(
+                status="success",
+                payload={"suggestions": []},
+                original_msg=request
             )
+        
+        matched = set()
+        cart_item_ids = frozenset()
+        
+        if cart:
+            cart_item_ids = frozenset(item.get("item_id") for item in cart)
             
-            if trigger_match or (context_rule and context_match):
-                suggestions.append({
-                    "item_id": rule["item_id"],
-                    "name": rule["name"],
-                    "pitch": rule["pitch"],
-                    "reason": rule["reason"]
-                })
+            # Check trigger items, once per distinct word across the cart
+            cart_tokens = set()
+            for item in cart:
+                cart_tokens.update(_WORD_RE.findall(item.get("name", "").lower()))
+            for token in cart_tokens:
+                matched.update(_rules_for_word(token))
+        
+        # Check context match
+        for key in (_CONTEXT_RULES if context else ()):
+            if all(context.get(k) == v for k, v in SUGGESTIONS[key]["context"].items()):
+                matched.add(key)
+        
+        # Skip items already in cart
+        suggestions = [
+            _RESPONSE_BY_RULE[key]
+            for key in sorted(matched, key=_RULE_ORDER.__getitem__)
+            if SUGGESTIONS[key]["item_id"] not in cart_item_ids
+        ]
         
         # Limit to top 3 suggestions
         suggestions = suggestions[:3]
@@ -112,6 +173,7 @@ class MockRecsysAgent:
 
 
 async def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     agent = MockRecsysAgent()
     try:
         await agent.start()
@@ -120,4 +182,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())